@@ -173,6 +173,13 @@ class Dendrite( ABC, torch.nn.Module ):
         """
         bittensor.logging.trace('Dendrite.apply()')
         try:
+            # Endpoints without a serving ip can never answer, fail fast instead of waiting out the timeout.
+            if not self.axon_info.is_serving:
+                dendrite_call.return_code = bittensor.proto.ReturnCode.Unavailable
+                dendrite_call.return_message = 'Endpoint is not serving'
+                bittensor.logging.trace( 'Dendrite.apply() endpoint not serving: {}'.format( self.axon_info.hotkey ) )
+                return dendrite_call
+
             dendrite_call.log_outbound()
             asyncio_future = dendrite_call.get_callable()(
                 request = dendrite_call._get_request_proto(),
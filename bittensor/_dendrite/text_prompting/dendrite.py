@@ -65,7 +65,7 @@ class DendriteForwardCall( bittensor.DendriteCall ):
             messages = self.messages,
             completion = self.completion,
             rewards = [ reward ],
-            timeout = self.timeout if timeout is None else bittensor.__blocktime__
+            timeout = self.timeout if timeout is None else timeout
         )
 
     async def async_backward( self, reward: float, timeout: float = None ) -> 'DendriteBackwardCall':
@@ -74,7 +74,7 @@ class DendriteForwardCall( bittensor.DendriteCall ):
             messages = self.messages,
             completion = self.completion,
             rewards = [ reward ],
-            timeout = self.timeout if timeout is None else bittensor.__blocktime__
+            timeout = self.timeout if timeout is None else timeout
         )
 
 
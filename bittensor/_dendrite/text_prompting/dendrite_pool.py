@@ -20,7 +20,7 @@ import json
 import torch
 import asyncio
 import bittensor
-from typing import Callable, List, Dict, Union
+from typing import Callable, List, Dict, Union, Optional
 
 class TextPromptingDendritePool( torch.nn.Module ):
 
@@ -28,25 +28,65 @@ class TextPromptingDendritePool( torch.nn.Module ):
             self,
             keypair: Union[ 'bittensor.Wallet', 'bittensor.Keypair'],
             metagraph: 'bittensor.metagraph',
+            dendrites: List[ 'bittensor.text_prompting' ] = None,
         ):
+        """ Pool of text prompting dendrites, one per uid in the metagraph.
+            Args:
+                keypair (:obj:`Union[ 'bittensor.Wallet', 'bittensor.Keypair']`, `required`):
+                    bittensor keypair used for signing messages.
+                metagraph (:obj:`bittensor.metagraph`, `required`):
+                    metagraph the dendrites are built from.
+                dendrites (:obj:`List[ 'bittensor.text_prompting' ]`, `optional`):
+                    existing dendrites to share, e.g. with another pool over the same metagraph,
+                    so their channels are reused instead of opening one more per uid.
+        """
         super(TextPromptingDendritePool, self).__init__()
         self.metagraph = metagraph
         self.keypair = keypair
-        self.ip = bittensor.utils.networking.get_external_ip()
-        self.dendrites = [ bittensor.text_prompting( axon = axon, keypair = self.keypair, uid = uid, ip = self.ip) for uid, axon in enumerate(self.metagraph.axons) ]
+        if dendrites is None:
+            self.ip = bittensor.utils.networking.get_external_ip()
+            dendrites = [ bittensor.text_prompting( axon = axon, keypair = self.keypair, uid = uid, ip = self.ip) for uid, axon in enumerate(self.metagraph.axons) ]
+        else:
+            self.ip = dendrites[0].ip if len( dendrites ) > 0 else None
+        self.dendrites = dendrites
         self.loop = asyncio.get_event_loop()
         self.priority_threadpool = bittensor.prioritythreadpool(max_workers = 1)
 
+    def resync(
+            self,
+            metagraph: 'bittensor.metagraph',
+            dendrites: List[ 'bittensor.text_prompting' ] = None,
+        ):
+        """ Points the pool at a freshly synced metagraph.
+            The existing dendrite, and so its open channel, is kept for every uid whose axon info is unchanged,
+            only new or changed axons get a new dendrite.
+            Args:
+                metagraph (:obj:`bittensor.metagraph`, `required`):
+                    synced metagraph to build the dendrites from.
+                dendrites (:obj:`List[ 'bittensor.text_prompting' ]`, `optional`):
+                    already resynced dendrites to share with another pool instead of rebuilding them.
+        """
+        if dendrites is None:
+            dendrites = []
+            for uid, axon in enumerate( metagraph.axons ):
+                if uid < len( self.dendrites ) and self.dendrites[ uid ].axon_info == axon:
+                    dendrites.append( self.dendrites[ uid ] )
+                else:
+                    dendrites.append( bittensor.text_prompting( axon = axon, keypair = self.keypair, uid = uid, ip = self.ip ) )
+        self.metagraph = metagraph
+        self.dendrites = dendrites
+
     def backward( self,
             forward_calls: List[ 'DendriteForwardCall' ],
             rewards: Union[ List[ float ], torch.FloatTensor ],
             timeout: float = 12.0,
             priority: int = 1,
-        ):
+        ) -> List['DendriteBackwardCall']:
         def _backward():
-            self.loop.run_until_complete(
+            return self.loop.run_until_complete(
                 self.async_backward (
                     forward_calls = forward_calls,
+                    rewards = rewards,
                     timeout = timeout,
                 )
             )
@@ -60,13 +100,15 @@ class TextPromptingDendritePool( torch.nn.Module ):
             forward_calls: List[ 'DendriteForwardCall' ],
             rewards: Union[ List[ float ], torch.FloatTensor ] ,
             timeout: float = 12.0
-        ):
+        ) -> List['DendriteBackwardCall']:
         rewards = rewards if not isinstance( rewards, torch.Tensor ) else rewards.tolist()
+        if len( forward_calls ) != len( rewards ):
+            raise ValueError( 'Expected one reward per forward call, got {} calls and {} rewards'.format( len( forward_calls ), len( rewards ) ) )
         async def query():
-            coroutines = [ forward_calls.async_backward( reward ) for call, reward in list(zip( forward_calls, rewards )) ]
+            coroutines = [ call.async_backward( reward, timeout = timeout ) for call, reward in list(zip( forward_calls, rewards )) ]
             all_responses = await asyncio.gather( *coroutines )
             return all_responses
-        await query()
+        return await query()
 
     def forward(
             self,
@@ -120,4 +162,64 @@ class TextPromptingDendritePool( torch.nn.Module ):
             coroutines = [ call_single_uid( uid ) for uid in uids ]
             all_responses = await asyncio.gather(*coroutines)
             return all_responses
-        return await query()
\ No newline at end of file
+        return await query()
+
+    def forward_first(
+            self,
+            roles: Union[ str, List[str] ],
+            messages: Union[ str, List[str] ],
+            uids: Union[ torch.LongTensor, List[int] ],
+            accept: Callable[ ['DendriteForwardCall'], bool ],
+            timeout: float = 12,
+            priority: int = 1,
+        ) -> Optional['DendriteForwardCall']:
+        def _forward_first():
+            bittensor.logging.trace( 'dendrite pool: forward_first: _forward_first: start')
+            return self.loop.run_until_complete(
+                self.async_forward_first (
+                    messages = messages,
+                    roles = roles,
+                    uids = uids,
+                    accept = accept,
+                    timeout = timeout,
+                )
+            )
+        future = self.priority_threadpool.submit(
+            _forward_first,
+            priority = priority
+        )
+        return future.result()
+
+    async def async_forward_first(
+            self,
+            roles: Union[ str, List[str] ],
+            messages: Union[ str, List[str] ],
+            uids: Union[ torch.LongTensor, List[int] ],
+            accept: Callable[ ['DendriteForwardCall'], bool ],
+            timeout: float = 12
+        ) -> Optional['DendriteForwardCall']:
+        """ Queries all uids concurrently and returns the first call, in uids order, for which accept(call) is True.
+            Returns as soon as that call and every call ahead of it have completed, the remaining queries are cancelled
+            and awaited so nothing is left pending on the shared loop.
+            Returns None if no call is accepted.
+        """
+        if isinstance( uids, torch.Tensor ): uids = uids.tolist()
+        tasks = [
+            asyncio.ensure_future( self.dendrites[uid].async_forward(
+                roles = roles,
+                messages = messages,
+                return_call = True,
+                timeout = timeout
+            ))
+            for uid in uids
+        ]
+        try:
+            for task in tasks:
+                forward_call = await task
+                if accept( forward_call ):
+                    return forward_call
+            return None
+        finally:
+            pending = [ task for task in tasks if not task.done() ]
+            for task in pending: task.cancel()
+            await asyncio.gather( *pending, return_exceptions = True )
@@ -164,7 +164,6 @@ class metagraph( torch.nn.Module ):
         state_dict = self.state_dict()
         state_dict['axons'] = self.axons
         torch.save(state_dict, graph_file)
-        state_dict = torch.load( graph_file )
         return self
 
     def load( self ) -> 'metagraph':
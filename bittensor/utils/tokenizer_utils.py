@@ -268,7 +268,8 @@ def get_tokenizer_depth_split_map(tokenizer: PreTrainedTokenizerBase,
     """
     split_map = []
 
-    phrases = tokenizer.batch_decode(range(tokenizer.vocab_len))  # list of variable len strings (one per token)
+    set_vocab_decoded(tokenizer)
+    phrases = tokenizer.vocab_decoded  # list of variable len strings (one per token)
 
     # first part of the phrase up to distance characters
     split_phrases = [[phrase[:depths[0]] for phrase in phrases]]
@@ -417,12 +418,20 @@ def get_translation_map(from_tokenizer: PreTrainedTokenizerBase,
                 Maps for each observed length, a source token to a token sequence of that length,
                 with source index to target indices.
     """
+    # The map only depends on the two vocabularies, so it is built once per tokenizer pair and kept on
+    # from_tokenizer. The to_tokenizer is stored alongside it so its id can not be reused by another tokenizer.
+    if not hasattr(from_tokenizer, 'translation_maps'):
+        from_tokenizer.translation_maps = {}
+    if id(to_tokenizer) in from_tokenizer.translation_maps:
+        return from_tokenizer.translation_maps[id(to_tokenizer)][1]
+
     set_vocab_len(from_tokenizer)
     set_vocab_len(to_tokenizer)
 
     translation_map = {'lengths': {}}
 
-    phrases = from_tokenizer.batch_decode(range(from_tokenizer.vocab_len))  # tokens to strings
+    set_vocab_decoded(from_tokenizer)
+    phrases = from_tokenizer.vocab_decoded  # tokens to strings
 
     to_tokens = to_tokenizer(phrases)['input_ids']  # convert single token from-phrases to to-tokenization
     to_tokens_lens = [len(p) for p in to_tokens]
@@ -441,6 +450,7 @@ def get_translation_map(from_tokenizer: PreTrainedTokenizerBase,
         counts[:l, :].scatter_add_(1, to_idx.T, torch.ones((l, len(subset)), dtype=torch.long))
 
     translation_map['counts'] = counts
+    from_tokenizer.translation_maps[id(to_tokenizer)] = (to_tokenizer, translation_map)
     return translation_map
 
 
@@ -606,7 +616,7 @@ def get_top_probs(probs: torch.FloatTensor, tokenizer: PreTrainedTokenizerBase,
     """
     string = ''
 
-    vals, indices = probs.sort(dim=-1, descending=True)  # descending sort token probabilities
+    vals, indices = probs.topk(amount, dim=-1)  # only the top amount token probabilities, in descending order
 
     for i in range(amount):
         string += '%.4f[%s] ' % (vals[i], tokenizer.decode(indices[i]))  # prob[token-string]
@@ -662,7 +672,7 @@ def translate_logits_to_probs_std(logits: torch.FloatTensor,
 
     # === Check tokenizer equivalence / Skip if equivalent ===
     if skip_equivalent and check_tokenizer_equivalence(tokenizer, std_tokenizer):
-        logits = logits.to(torch.float).to('cpu')
+        logits = logits.to(device='cpu', dtype=torch.float)  # single host transfer and cast
         probs = torch.softmax(logits, dim=2)
         return probs
 
@@ -676,9 +686,13 @@ def translate_logits_to_probs_std(logits: torch.FloatTensor,
         vocab_size = tokenizer.vocab_len
 
     # === Convert logits to probabilities ===
-    logits = logits.to(torch.float).to('cpu')
+    logits = logits.to(device='cpu', dtype=torch.float)  # single host transfer and cast
     probs = torch.softmax(logits, dim=2)  # [batch_size, sequence_len, vocab_size]
 
+    # translation runs on cpu, move the token sequences once instead of per batch item
+    tokens = tokens.cpu()  # [batch_size, sequence_len]
+    tokens_std = tokens_std.cpu()  # [batch_size, std_sequence_len]
+
     if vocab_size < tokenizer.vocab_len:  # fixes bug when model logits output is not full width
         padded_probs = torch.zeros((batch_size, sequence_len, tokenizer.vocab_len))
         padded_probs[..., :vocab_size] = probs
@@ -695,14 +709,16 @@ def translate_logits_to_probs_std(logits: torch.FloatTensor,
                                   tokens_b, tokens_std[b])
 
     # === Correct excess probability mass (haircut) ===
+    # in-place over the whole tensor with per-position factors, masked indexing would copy the selected rows twice
     probs_std_sum = probs_std.sum(dim=-1)  # [batch_size, std_sequence_len]
     over = (probs_std_sum > 1)
-    probs_std[over] /= probs_std_sum[over][:, None]
+    probs_std /= torch.where(over, probs_std_sum, torch.ones_like(probs_std_sum))[..., None]
 
     # === Correct deficient probability mass (raise) ===
     probs_std_sum = probs_std.sum(dim=-1)  # [batch_size, std_sequence_len]
     under = (probs_std_sum < 1)
-    probs_std[under] += ((1 - probs_std_sum[under]) / probs_std[under].shape[-1])[:, None]  # raise noise floor so sum 1
+    probs_std += torch.where(under, (1 - probs_std_sum) / std_vocab_size,
+                             torch.zeros_like(probs_std_sum))[..., None]  # raise noise floor so sum 1
 
     return probs_std  # [batch_size, std_sequence_len, std_vocab_size]
 
@@ -745,50 +761,39 @@ def topk_token_phrases(logits: torch.Tensor, tokenizer: PreTrainedTokenizerBase,
     """
     # Get shape sizes
     batch_size, vocab_size = logits.shape  # [batch_size, vocab_size] only last token prediction
+    if topk > vocab_size:
+        raise ValueError(f'topk_token_phrases(): topk {topk} exceeds vocab_size {vocab_size}.')
 
-    # Convert logits to probabilities
+    # TopK phrase selection, softmax is monotonic so select on logits and only normalize the topk
     logits = logits.float()  # ensure further computations done in float32 for improved precision
-    probs = torch.softmax(logits, dim=1)  # [batch_size, vocab_size]
-
-    # TopK phrase selection
-    topk_probs, topk_indices = torch.topk(probs, topk)  # topk probs and indices: [batch_size, topk]
+    topk_logits, topk_indices = torch.topk(logits, topk)  # topk logits and indices: [batch_size, topk]
+    log_normalizer = torch.logsumexp(logits, dim=1, keepdim=True)  # [batch_size, 1] log of softmax denominator
+    topk_probs = torch.exp(topk_logits - log_normalizer)  # [batch_size, topk] topk probs
 
     # === Calculate floor probability ===
     topk_pmass = topk_probs.sum(dim=-1)  # [batch_size] topk probability mass
     remainder_pmass = torch.clamp(1 - topk_pmass, 1e-40, 1)  # [batch_size] remainder probability mass
-    floor_probs = remainder_pmass / (vocab_size - topk)  # [batch_size]divide remainder
-
-    # convert to list for faster iteration in list comprehension
-    topk_probs_list = topk_probs.tolist()
-    topk_indices_list = topk_indices.tolist()
-    floor_probs_list = floor_probs.tolist()
-
-    # === Construct topk phrases list ===
-    probs = []  # collect probability tensors with gradients attached (to be grafted into topk_tensor)
-    phrases = []  # form topk token phrases with prob prepend [prob, tok_0, tok_1, ... tok_n]
-
-    for b in range(batch_size):
-        # collect probability tensors with gradients attached (to be grafted into topk_tensor)
-        probs += [topk_probs[b], floor_probs[b]]  # [tensor(prob_k=0_b, prob_k=1_b, ...), tensor(prob_floor_b)]
-
-        # form topk token phrases with prob prepend [prob, tok_0, tok_1, ... tok_n]
-        phrases += [[prob] + tokenizer.std_token_phrases[i]
-                    for prob, i in zip(topk_probs_list[b], topk_indices_list[b])]  # [prob_k, tok_0_k, tok_1_k, ...]
+    floor_probs = remainder_pmass / max(vocab_size - topk, 1)  # [batch_size] divide remainder, none left if topk == vocab_size
 
-        # also add prob_floor for batch item
-        phrases += [[floor_probs_list[b]]]  # [prob_floor_b]
+    # === Gather topk token phrases from the padded std_token_phrases ===
+    set_std_token_phrases_tensor(tokenizer)
+    topk_indices = topk_indices.cpu()  # phrase table is kept on cpu, only the small gathered block is moved
+    phrase_len = tokenizer.std_token_phrases_len[topk_indices]  # [batch_size, topk] phrase lengths
 
     # determine width of topk_tensor as max len of all phrase lists (with prob in front)
-    max_len = max([len(p) for p in phrases])  # max_{b,k}(len([prob_k, tok_0_k, tok_1_k, ...]))
+    max_len = 1 + (phrase_len.max().item() if phrase_len.numel() else 0)  # max_{b,k}(len([prob_k, tok_0_k, tok_1_k, ...]))
 
-    # form single 2D tensor with all phrase and probs (typically to send to axon wire encoding)
-    topk_tensor = torch.tensor([p + [ignore_index] * (max_len - len(p))
-                                for p in phrases]).to(logits.device)  # [batch_size * (topk + 1), max_len]
+    phrases = tokenizer.std_token_phrases_tensor[topk_indices, :max_len - 1]  # [batch_size, topk, max_len - 1]
+    phrases = phrases.masked_fill(phrases < 0, ignore_index)  # [tok_0_k, tok_1_k, ..., ignore_index?]
 
-    # grafting probability tensors into first column to attach gradients
-    topk_tensor[:, 0] = torch.hstack(probs)  # tensor([prob_k=0_b, prob_k=1_b, ..., prob_floor_b])
+    # form single tensor with all phrases and probs (typically to send to axon wire encoding)
+    topk_tensor = torch.full((batch_size, topk + 1, max_len), ignore_index, dtype=torch.float)
+    topk_tensor[:, :topk, 1:] = phrases
+    topk_tensor = topk_tensor.to(logits.device)  # [batch_size, (topk + 1), max_len]
 
-    topk_tensor = topk_tensor.reshape(batch_size, topk + 1, max_len)  # [batch_size, (topk + 1), max_len] reshaped
+    # grafting probability tensors into first column to attach gradients
+    topk_tensor[:, :topk, 0] = topk_probs  # [prob_k=0_b, prob_k=1_b, ...]
+    topk_tensor[:, topk, 0] = floor_probs  # [prob_floor_b]
 
     return topk_tensor  # [batch_size, (topk + 1), max_len] (probability gradients attached in first column)
 
@@ -880,12 +885,12 @@ def unravel_topk_token_phrases(compact_topk: torch.Tensor, topk: int, ignore_ind
 
     # Obtain phrase lengths and maximum phrase length
     phrase_len = prob_idx[1:] - prob_idx[:-1]  # [batch_size * (topk + 1) - 1] length of each phrase
-    phrase_len = torch.cat((phrase_len, torch.tensor([1])))  # [batch_size * (topk + 1)] prob_floor is always len=1
+    phrase_len = torch.cat((phrase_len, torch.ones(1, dtype=phrase_len.dtype, device=phrase_len.device)))  # [batch_size * (topk + 1)] prob_floor is always len=1
     max_len = phrase_len.max()  # determine width of topk_tensor as max len of all phrase lists (with prob in front)
 
     # Initialize topk_tensor with ignore_index + 2, since decrement with 2 follows to remove token offset later
-    topk_tensor = torch.ones((batch_size * (topk + 1), max_len), device=compact_topk.device)
-    topk_tensor *= ignore_index + 2  # [batch_size * (topk + 1), max_len]
+    topk_tensor = torch.full((batch_size * (topk + 1), max_len), ignore_index + 2,
+                             dtype=torch.float, device=compact_topk.device)  # [batch_size * (topk + 1), max_len]
 
     # Insert phrases of each unique length as block into topk_tensor
     for unique_len in phrase_len.unique():
@@ -896,10 +901,10 @@ def unravel_topk_token_phrases(compact_topk: torch.Tensor, topk: int, ignore_ind
         compact_idx = prob_idx[phrase_idx]  # indices in compact_topk
 
         # Create indexing block, add index for each phrase position, skip first (prob) position
-        block_idx = [compact_idx + position for position in range(1, unique_len)]  # incrementally add each position of phrase
-        # transpose .t() ensures correct interleaving of consecutive positions:
+        # broadcasting the positions along the last dim gives consecutive positions per phrase:
         # [[phrase_a_1, phrase_a_2, ..., phrase_a_n], [phrase_b_1, phrase_b_2, ..., phrase_b_n], ...]
-        block_idx = torch.vstack(block_idx).t().reshape(-1, unique_len - 1)  # [-1, unique_len - 1] for all phrases with unique_len
+        positions = torch.arange(1, unique_len, device=compact_idx.device)  # [unique_len - 1]
+        block_idx = compact_idx[:, None] + positions  # [-1, unique_len - 1] for all phrases with unique_len
 
         topk_tensor[phrase_idx, 1:unique_len] = compact_topk[block_idx]  # slice selected phrases and copy into topk_tensor
 
@@ -967,8 +972,8 @@ def phrase_cross_entropy(target_phrases: Union[List[List[int]], torch.Tensor],
     n_topk_probs = topk_probs / total_probs[:, None]  # [batch_size, topk] normalized topk_probs
     n_floor_probs = floor_probs / total_probs  # [batch_size] normalized floor_probs
 
-    val_probs = torch.zeros(batch_size).to(topk_probs.device)  # accumulate probabilities when first tokens match
-    match_probs = torch.zeros(batch_size).to(topk_probs.device)  # accumulate probabilities when sub target matches phrase
+    val_probs = torch.zeros(batch_size, device=topk_probs.device)  # accumulate probabilities when first tokens match
+    match_probs = torch.zeros(batch_size, device=topk_probs.device)  # accumulate probabilities when sub target matches phrase
     for b in range(batch_size):
         target_phrase = target_phrases[b]
         if not isinstance(target_phrase, torch.Tensor):
@@ -985,7 +990,7 @@ def phrase_cross_entropy(target_phrases: Union[List[List[int]], torch.Tensor],
         # === Integrate sub target matches ===
         check_len = min(max_len - 1, len(target_phrase))
         for c in range(1, check_len + 1):  # progressively increase sub target length
-            target = ignore_index * torch.ones(check_len, dtype=torch.int32).to(topk_tensor.device)  # [-100, ..., -100]
+            target = torch.full((check_len,), ignore_index, dtype=torch.int32, device=topk_tensor.device)  # [-100, ..., -100]
             target[:c] = target_phrase[:c]  # [tok0, tok1, ...tokc, -100, ..., -100]
 
             # Find sub target matches
@@ -1056,7 +1061,10 @@ def topk_tokens_to_vocab_size(topk_tensor: torch.Tensor, vocab_size_std: int, vo
     n_topk_probs = topk_probs / total_probs[:, None]  # [batch_size, topk] normalized topk_probs
 
     # === Convert to logits tensor ===
-    probs = torch.zeros((batch_size, vocab_size_std))  # [batch_size, vocab_size_std]
+    # allocate in the precision and on the device of the incoming probabilities, so half precision
+    # inputs produce a half precision tensor and no host allocation or copy is needed
+    probs = torch.zeros((batch_size, vocab_size_std), dtype=n_topk_probs.dtype,
+                        device=n_topk_probs.device)  # [batch_size, vocab_size_std]
     probs.scatter_add_(1, topk_tokens, n_topk_probs)  # accumulate token probabilities onto logits tensor
 
     return probs  # [batch_size, vocab_size_std]
@@ -1081,10 +1089,17 @@ def check_tokenizer_equivalence(tokenizer_to_check: PreTrainedTokenizerBase,
     if tokenizer_to_check.vocab_len != target_tokenizer.vocab_len:
         return False
 
-    to_check_vocab = tokenizer_to_check.batch_decode(range(tokenizer_to_check.vocab_len))
-    target_vocab = target_tokenizer.batch_decode(range(target_tokenizer.vocab_len))
+    # The full vocabulary comparison is only done once per tokenizer pair, the result is kept on tokenizer_to_check
+    # like get_translation_map, since translate_logits_to_probs_std checks equivalence on every translation.
+    if not hasattr(tokenizer_to_check, 'equivalence'):
+        tokenizer_to_check.equivalence = {}
+    if id(target_tokenizer) not in tokenizer_to_check.equivalence:
+        set_vocab_decoded(tokenizer_to_check)
+        set_vocab_decoded(target_tokenizer)
+        equivalent = tokenizer_to_check.vocab_decoded == target_tokenizer.vocab_decoded  # indexed tokenizer vocabularies should match
+        tokenizer_to_check.equivalence[id(target_tokenizer)] = (target_tokenizer, equivalent)
 
-    return to_check_vocab == target_vocab  # indexed tokenizer vocabularies should match
+    return tokenizer_to_check.equivalence[id(target_tokenizer)][1]
 
 
 def prune_tokens(inputs: torch.FloatTensor, prune_len: int = 1, margin: int = 3):
@@ -1241,6 +1256,13 @@ def get_special_token_pairings(from_tokenizer: PreTrainedTokenizerBase,
             pairings (:obj:`Dict[str, str]`, `required`):
                 Prioritized dictionary of From_special_token_text -> To_special_token_text.
     """
+    # Pairings only depend on the two tokenizers, so they are determined once per tokenizer pair and kept on
+    # from_tokenizer, like get_translation_map.
+    if not hasattr(from_tokenizer, 'special_token_pairings'):
+        from_tokenizer.special_token_pairings = {}
+    if id(to_tokenizer) in from_tokenizer.special_token_pairings:
+        return from_tokenizer.special_token_pairings[id(to_tokenizer)][1]
+
     pairings = {}
 
     # some tokenizers e.g. GPT2 have the same text signifying BOS and EOS, while in other e.g. XGLM they differ
@@ -1253,6 +1275,7 @@ def get_special_token_pairings(from_tokenizer: PreTrainedTokenizerBase,
             if getattr(from_tokenizer, special_token) not in pairings:  # prevent priority overwrite
                 pairings[getattr(from_tokenizer, special_token)] = getattr(to_tokenizer, special_token)
 
+    from_tokenizer.special_token_pairings[id(to_tokenizer)] = (to_tokenizer, pairings)
     return pairings
 
 
@@ -1334,6 +1357,21 @@ def set_vocab_len(tokenizer: PreTrainedTokenizerBase):
             tokenizer.vocab_len = tokenizer.vocab_size
 
 
+def set_vocab_decoded(tokenizer: PreTrainedTokenizerBase):
+    r"""
+    Sets the tokenizer.vocab_decoded if unset, to store the decoded token string of every token in the vocabulary.
+    Decoding the full vocabulary is slow, so it is done once per tokenizer and shared by all functions needing it.
+        Args:
+            tokenizer (:obj:`PreTrainedTokenizerBase`, `required`):
+                Tokenizer to set vocab_decoded for.
+        Returns:
+
+    """
+    if not hasattr(tokenizer, 'vocab_decoded'):
+        set_vocab_len(tokenizer)
+        tokenizer.vocab_decoded = tokenizer.batch_decode(range(tokenizer.vocab_len))  # tokens to strings
+
+
 def set_whitespace_preserving(tokenizer: PreTrainedTokenizerBase):
     r"""
     Sets the tokenizer.whitespace_preserving if unset, indicates if tokenizer preserves whitespace like GPT-style,
@@ -1369,17 +1407,38 @@ def set_std_token_phrases(tokenizer, std_tokenizer):
     """
     # === Tokenizer phrases to memory ===
     if not hasattr(tokenizer, 'phrases'):
+        set_vocab_decoded(tokenizer)
         if tokenizer.whitespace_preserving:
-            tokenizer.phrases = tokenizer.batch_decode(range(tokenizer.vocab_len))  # server tokens to strings
+            tokenizer.phrases = tokenizer.vocab_decoded  # server tokens to strings
         else:
-            tokenizer.phrases = [' ' + phrase for phrase in
-                                 tokenizer.batch_decode(range(tokenizer.vocab_len))]  # server tokens to strings
+            tokenizer.phrases = [' ' + phrase for phrase in tokenizer.vocab_decoded]  # server tokens to strings
 
     if not hasattr(tokenizer, 'std_token_phrases'):
         # Retokenize phrases to new tokenizer
         tokenizer.std_token_phrases = std_tokenizer(tokenizer.phrases)['input_ids']  # [topk, max_len] convert phrases to tokens sequences
 
 
+def set_std_token_phrases_tensor(tokenizer):
+    r"""
+    Sets std_token_phrases_tensor, the std_token_phrases padded with -1 into a single [vocab_len, max_phrase_len]
+    tensor, and std_token_phrases_len, the [vocab_len] length of each phrase.
+    Used by topk_token_phrases to gather the phrases of the topk tokens instead of padding them in python.
+    Requires set_std_token_phrases first.
+        Args:
+            tokenizer(:obj:`PreTrainedTokenizerBase`, `required`):
+                Tokenizer to set std_token_phrases_tensor for.
+
+        Returns:
+
+    """
+    if not hasattr(tokenizer, 'std_token_phrases_tensor'):
+        phrase_len = [len(phrase) for phrase in tokenizer.std_token_phrases]
+        max_len = max(phrase_len + [1])
+        tokenizer.std_token_phrases_len = torch.tensor(phrase_len, dtype=torch.long)
+        tokenizer.std_token_phrases_tensor = torch.tensor([phrase + [-1] * (max_len - len(phrase))
+                                                           for phrase in tokenizer.std_token_phrases], dtype=torch.long)
+
+
 def prep_tokenizer(tokenizer, std_tokenizer=None):
     tokenizer.padding_side = "left"  # Generative default expects most recent token on right-hand side with padding on left. https://github.com/huggingface/transformers/pull/10552
     # tokenizer.add_prefix_space = False
@@ -1419,5 +1478,6 @@ def prep_tokenizer(tokenizer, std_tokenizer=None):
 
     if std_tokenizer is not None:
         set_std_token_phrases(tokenizer, std_tokenizer)
+        set_std_token_phrases_tensor(tokenizer)
 
     return tokenizer
@@ -24,13 +24,12 @@ from transformers import StoppingCriteria, StoppingCriteriaList
 
 class StopOnTokens( StoppingCriteria ):
     def __init__( self, stop_token_ids: List[int] = None ):
-        self.stop_token_ids = stop_token_ids
+        self.stop_token_ids = set( stop_token_ids or [] )
 
     def __call__( self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs ) -> bool:
-        for stop_id in self.stop_token_ids:
-            if input_ids[0][-1] == stop_id:
-                return True
-        return False
+        # Runs once per generated token: read the last token back from the device once
+        # instead of syncing on a tensor comparison for every stop id.
+        return input_ids[0][-1].item() in self.stop_token_ids
 
 class OasstPythiaMiner( bittensor.HuggingFaceMiner ):
     arg_prefix = 'oasst_pythia'
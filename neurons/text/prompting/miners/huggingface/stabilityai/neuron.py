@@ -24,12 +24,12 @@ from typing import List, Dict
 from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline, StoppingCriteria, StoppingCriteriaList
 
 class StopOnTokens( StoppingCriteria ):
+    stop_ids = { 50278, 50279, 50277, 1, 0 }
+
     def __call__( self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs ) -> bool:
-        stop_ids = [50278, 50279, 50277, 1, 0]
-        for stop_id in stop_ids:
-            if input_ids[0][-1] == stop_id:
-                return True
-        return False
+        # Runs once per generated token: read the last token back from the device once
+        # instead of syncing on a tensor comparison for every stop id.
+        return input_ids[0][-1].item() in self.stop_ids
 
 class StabilityAIMiner( bittensor.HuggingFaceMiner ):
     arg_prefix: str = 'stabilityai'
@@ -2,7 +2,6 @@ from dataclasses import dataclass
 from typing import List, Optional
 
 import torch
-import torch.nn.functional as F
 from coati.experience_maker.base import Experience
 
 
@@ -51,12 +50,14 @@ def split_experience_batch(experience: Experience) -> List[BufferItem]:
 def zero_pad_sequences(sequences: List[torch.Tensor], side: str = 'left') -> torch.Tensor:
     assert side in ('left', 'right')
     max_len = max(seq.size(0) for seq in sequences)
-    padded_sequences = []
-    for seq in sequences:
-        pad_len = max_len - seq.size(0)
-        padding = (pad_len, 0) if side == 'left' else (0, pad_len)
-        padded_sequences.append(F.pad(seq, padding))
-    return torch.stack(padded_sequences, dim=0)
+    # write each sequence straight into one zeroed batch tensor instead of padding copies and stacking them
+    padded_sequences = sequences[0].new_zeros((len(sequences), max_len, *sequences[0].shape[1:]))
+    for i, seq in enumerate(sequences):
+        if side == 'left':
+            padded_sequences[i, max_len - seq.size(0):] = seq
+        else:
+            padded_sequences[i, :seq.size(0)] = seq
+    return padded_sequences
 
 
 def make_experience_batch(items: List[BufferItem]) -> Experience:
@@ -2,6 +2,7 @@ from typing import Optional
 
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 
 from utils import masked_mean
 
@@ -11,15 +12,18 @@ class GPTLMLoss(nn.Module):
     GPT Language Model Loss
     """
 
-    def __init__(self):
+    def __init__(self, ignore_index: int = -100):
         super().__init__()
-        self.loss = nn.CrossEntropyLoss()
+        self.ignore_index = ignore_index
 
     def forward(self, logits: torch.Tensor, labels: torch.Tensor) -> torch.Tensor:
-        shift_logits = logits[..., :-1, :].contiguous()
-        shift_labels = labels[..., 1:].contiguous()
+        # Shift the labels instead of the logits: the last position gets ignore_index, so the full
+        # logits can be flattened as a view rather than copying a [batch, seq - 1, vocab] slice.
+        shift_labels = torch.full_like(labels, self.ignore_index)
+        shift_labels[..., :-1] = labels[..., 1:]
         # Flatten the tokens
-        return self.loss(shift_logits.view(-1, shift_logits.size(-1)), shift_labels.view(-1))
+        return F.cross_entropy(logits.reshape(-1, logits.size(-1)), shift_labels.reshape(-1),
+                               ignore_index=self.ignore_index)
 
 
 class PolicyLoss(nn.Module):
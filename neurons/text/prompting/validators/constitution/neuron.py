@@ -64,13 +64,15 @@ class neuron:
         self.subtensor = bt.subtensor ( config = self.config )
         self.wallet = bt.wallet ( config = self.config )
         self.metagraph = bt.metagraph( netuid = self.config.netuid, network = self.subtensor.network )
+        # Build one dendrite per uid up front and reuse them across queries.
+        self.dendrites = [ bittensor.text_prompting( keypair = self.wallet.hotkey, axon = axon, uid = uid ) for uid, axon in enumerate( self.metagraph.axons ) ]
         print ('done init')
 
     def train( self ):
         while True:
             uids = torch.tensor( random.sample( self.metagraph.uids.tolist(), 2 ), dtype = torch.int64 )
-            A = bittensor.text_prompting( keypair = self.wallet.hotkey, axon = self.metagraph.axons[uids[0]] )
-            B = bittensor.text_prompting( keypair = self.wallet.hotkey, axon = self.metagraph.axons[uids[1]] )
+            A = self.dendrites[ uids[0] ]
+            B = self.dendrites[ uids[1] ]
             resp_A = A.forward(
                 roles = ['user'],
                 messages = ['ask me a random question?'],
@@ -108,6 +108,8 @@ class neuron:
         parser.add_argument( '--neuron.inference_only', action = 'store_true', help = 'If set, training off and only inference will be served via axon.', default = False )
         parser.add_argument( '--neuron.axon_off', action = 'store_true', help = 'If set, the axon will be turned off.', default = False )
         parser.add_argument( '--neuron.reward_path', type = str, help = 'Path to reward model.', default = '~/.bittensor/reward_models' )
+        parser.add_argument( '--neuron.reward_batch_size', type = int, help = 'Number of completions scored per reward model forward pass.', default = 16 )
+        parser.add_argument( '--neuron.reward_compile', action = 'store_true', help = 'If set, compiles the reward model transformer with torch.compile (requires torch >= 2.0).', default = False )
         parser.add_argument( '--neuron.max_history', type = int, help = 'Maximum number history values to store at any time.', default = 100000 )
         parser.add_argument( '--neuron.device', type = str, help = 'Device to run the validator on.', default = "cuda" if torch.cuda.is_available() else "cpu" )
         parser.add_argument( '--neuron.epoch_length_override', type = int, help = 'Override the default timeout', default = -1 )
@@ -154,24 +156,35 @@ class neuron:
         # Reward model
         if not self.config.neuron.no_reward_model:
             bittensor.logging.info('Loading reward model')
-            self.reward_model = RewardModel( model_path = 'EleutherAI/gpt-j-6b', device = self.config.neuron.device )
+            self.reward_model = RewardModel( model_path = 'EleutherAI/gpt-j-6b', device = self.config.neuron.device, batch_size = self.config.neuron.reward_batch_size )
             for fpath in os.listdir( self.config.neuron.reward_path ):
                 if fpath.endswith(".pt") or fpath.endswith(".bin"):
                     checkpoint = os.path.join( self.config.neuron.reward_path, fpath )
                     break
-            ckpt_state = torch.load( checkpoint )
-            self.reward_model.load_state_dict( ckpt_state )
+            # Move the half precision model first so the checkpoint is copied straight into the device
+            # weights, rather than into a second full copy of the model held in host memory.
             self.reward_model.eval()
-            self.reward_model.half()
             self.reward_model.requires_grad_( False )
             self.reward_model.to( self.device )
+            ckpt_state = torch.load( checkpoint, map_location = 'cpu' )
+            self.reward_model.load_state_dict( ckpt_state )
+            # The weights now live in the model, release the host copy of the checkpoint and any
+            # cached device blocks left from loading before the filter and gating models are built.
+            del ckpt_state
+            if self.device.type == 'cuda': torch.cuda.empty_cache()
+            if self.config.neuron.reward_compile:
+                if hasattr( torch, 'compile' ):
+                    self.reward_model.transformer = torch.compile( self.reward_model.transformer, mode = 'reduce-overhead' )
+                    self.reward_model.pad_to_multiple_of = 64
+                else:
+                    bittensor.logging.warning( 'torch.compile is not available in torch {}, running the reward model eagerly'.format( torch.__version__ ) )
             bittensor.logging.info('done loading reward model')
 
         # Init the gating model which learns which miners to select for each query.
         self.gating_model = GatingModel( metagraph = self.metagraph, config = self.config ).to( self.device )
         # Denddrite pool for querying the network.
         self.dendrite_pool = bt.text_prompting_pool( keypair = self.wallet.hotkey, metagraph = self.metagraph )
-        self.inference_pool = bt.text_prompting_pool( keypair = self.wallet.hotkey, metagraph = self.metagraph )
+        self.inference_pool = bt.text_prompting_pool( keypair = self.wallet.hotkey, metagraph = self.metagraph, dendrites = self.dendrite_pool.dendrites )
         # History of forward events.
         self.history = queue.Queue( maxsize = self.config.neuron.max_history )
         # Get a list of peers delegating to me
@@ -264,8 +277,8 @@ class neuron:
         while len(input_ids) > 0:
             _input_ids = input_ids[:512]
 
-            with torch.no_grad():
-                output = self.filter_model(torch.tensor([_input_ids]).to(self.device))
+            with torch.inference_mode():
+                output = self.filter_model(torch.tensor([_input_ids], device=self.device))
             
             filter_out = output.logits[0, 0] < bound_score1 or output.logits[0, 1] > bound_score2
 
@@ -280,6 +293,21 @@ class neuron:
         self.filter_message_count += 1
         return filter_out
 
+    def available_uids( self ) -> torch.LongTensor:
+        """ Returns the uids which can be queried: axons that are serving and, when they hold a validator permit,
+            have no more than vpermit_tao_limit stake.
+            Shared by forward() and get_question() so both sample from the same set of miners.
+        """
+        # The metagraph replaces its axons list on every sync or load, so the uids are only recomputed then.
+        if getattr( self, '_available_uids_axons', None ) is not self.metagraph.axons:
+            # Filter non serving axons.
+            is_serving = torch.tensor( [ axon.is_serving for axon in self.metagraph.axons ], dtype = torch.bool )
+            # Filter validator permit > 1024 stake.
+            over_vpermit_limit = self.metagraph.validator_permit.data & ( self.metagraph.S.data > self.config.neuron.vpermit_tao_limit )
+            self._available_uids = ( is_serving & ~over_vpermit_limit ).nonzero().flatten()
+            self._available_uids_axons = self.metagraph.axons
+        return self._available_uids
+
     def forward(
             self, 
             roles: List[ str ],
@@ -329,19 +357,7 @@ class neuron:
         # Set `topk` to the number of items in `self.metagraph.n` if `topk` is not provided or is -1.
         # Find the available `uids` that are currently serving.
         # If `topk` is larger than the number of available `uids`, set `topk` to the number of available `uids`.
-        # Check if we have vpermit and if we do, ensure query only UIDs with less than vpermit_tao_limit.
-        def available( uid ) -> bool:
-            # Filter non serving axons.
-            if not self.metagraph.axons[uid].is_serving: 
-                return False
-            # Filter validator permit > 1024 stake.
-            if self.metagraph.validator_permit[uid]:
-                if self.metagraph.S[uid] > self.config.neuron.vpermit_tao_limit:
-                    return False
-            # Available otherwise.
-            return True
-        candidate_uids = [uid for uid, ax in enumerate(self.metagraph.axons) if available( uid )]
-        available_uids = torch.tensor( candidate_uids, dtype = torch.int64 ).to( self.device )
+        available_uids = self.available_uids().to( self.device )
         if topk is None or topk == -1: topk = self.metagraph.n.item()
         if topk > len( available_uids ): topk = len( available_uids )
         if len( available_uids ) == 0: bittensor.logging.error( 'no available uids' ); return None
@@ -370,7 +386,8 @@ class neuron:
 
         # Filter out any `None` `completions`.
         successful_uids = torch.tensor([uid for uid, call in list(zip(topk_uids, forward_calls)) if call is not None and call.completion is not None and len(call.completion)>10], dtype=torch.int64).to(self.device)
-        successful_completions = [call.completion for call in forward_calls if call is not None and call.completion is not None and len(call.completion)>10]
+        successful_calls = [call for call in forward_calls if call is not None and call.completion is not None and len(call.completion)>10]
+        successful_completions = [call.completion for call in successful_calls]
         unsuccessful_uids = torch.tensor([uid for uid in topk_uids if uid not in successful_uids])
         bittensor.logging.debug( 'successful_uids', successful_uids )
         if len( successful_completions ) == 0: bittensor.logging.error('no successful completions'); return None
@@ -396,7 +413,7 @@ class neuron:
         # Pass rewards backward for potential PPO.
         if train_network:
             self.dendrite_pool.backward( 
-                forward_calls = forward_calls,
+                forward_calls = successful_calls,
                 rewards = rewards,
                 timeout = timeout,
             )
@@ -480,6 +497,24 @@ class neuron:
         uids = scores.sort()[ 1 ][ -self.config.neuron.inference_topk: ]
         bittensor.logging.info( 'inference uids', str(uids) )
 
+        # Only the best scored valid completion is needed, so return it as soon as it and
+        # every higher scored uid have answered instead of waiting on all queried uids.
+        if ( dont_use_reward_model or self.config.neuron.no_reward_model ) and not return_all:
+            bittensor.logging.info('not applying the reward model taking the best completed response')
+            forward_start = time.time()
+            best_call = self.inference_pool.forward_first(
+                roles = roles,
+                messages = contents,
+                uids = uids.flip( 0 ),
+                accept = lambda call: len( call.completion ) > 0 and not self.filter_message( call.completion ),
+                timeout = timeout,
+            )
+            bittensor.logging.trace( 'finished dendrite forward_first ', time.time() - forward_start )
+            if best_call is None:
+                return 'no valid completions'
+            bittensor.logging.info( 'best completion', best_call.completion )
+            return best_call.completion
+
         # Query using dendrite pool
         forward_start = time.time()
         bittensor.logging.trace( 'applying dendrite forward' )
@@ -497,25 +532,15 @@ class neuron:
             # Return first best from scores.
             forward_calls.reverse()
             
-            if return_all:
-                completions = []
-                for call in forward_calls:
-                    if len( call.completion ) > 0 and not self.filter_message(call.completion):
-                        completions.append(call.completion)
-                if len(completions) > 0:
-                    return completions
-            
-            else:
-                for call in forward_calls:
-                    if len( call.completion ) > 0 and not self.filter_message(call.completion):
-                        bittensor.logging.info( 'best completion', call.completion )
-                        return call.completion
+            # Single completion requests returned above, only return_all reaches here.
+            completions = []
+            for call in forward_calls:
+                if len( call.completion ) > 0 and not self.filter_message(call.completion):
+                    completions.append(call.completion)
+            if len(completions) > 0:
+                return completions
 
-            if return_all:
-                return ['no valid completions']
-            
-            else:
-                return 'no valid completions'
+            return ['no valid completions']
             
 
         else:
@@ -579,7 +604,7 @@ class neuron:
             return None, None
         
         def _get_random_uids():
-            available_uids = torch.tensor( [ uid for uid, ax in enumerate( self.metagraph.axons ) if ax.is_serving ], dtype = torch.int64 )
+            available_uids = self.available_uids()
             uids = torch.tensor( random.sample( available_uids.tolist(), self.config.neuron.training_topk ), dtype = torch.int64 )
             return uids 
         
@@ -647,9 +672,9 @@ class neuron:
                     self.save()
                     delegates = self.subtensor.get_delegated( self.wallet.coldkeypub.ss58_address )
 
-                    # Recreate pools here to ensure sizing is correct.
-                    self.dendrite_pool = bt.text_prompting_pool( keypair = self.wallet.hotkey, metagraph = self.metagraph )
-                    self.inference_pool = bt.text_prompting_pool( keypair = self.wallet.hotkey, metagraph = self.metagraph )
+                    # Resync pools here to ensure sizing is correct, unchanged axons keep their dendrites.
+                    self.dendrite_pool.resync( self.metagraph )
+                    self.inference_pool.resync( self.metagraph, dendrites = self.dendrite_pool.dendrites )
 
                     self.my_nominators = { nomin[0]: nomin[1] for nomin in delegates[0][0].nominators } if len(delegates) else {}
                     self.check_weights()
@@ -730,9 +755,13 @@ class neuron:
             last_sync = self.subtensor.block
             while True:
                 time.sleep(12)
-                if self.subtensor.block -last_sync > 100:
+                # One chain query per wake up, and remember when we synced so the
+                # metagraph and checkpoints are reloaded every 100 blocks, not every 12s.
+                block = self.subtensor.block
+                if block - last_sync > 100:
                     self.metagraph.sync()
-                    self.last_sync = self.subtensor.block
+                    last_sync = block
+                    self.inference_pool.resync( self.metagraph )
                     self.load(inference_only = True)
 
         else:
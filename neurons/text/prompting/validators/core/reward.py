@@ -24,62 +24,98 @@ import bittensor
 from torch import nn
 from typing import List
 from transformers import AutoModelForCausalLM, AutoTokenizer, AutoConfig
+from transformers.modeling_utils import no_init_weights
 
 class RewardModel(nn.Module):
 
-    def __init__( self, model_path: str, device: str, config: 'bittensor.config' = None):
+    def __init__( self, model_path: str, device: str, config: 'bittensor.config' = None, batch_size: int = 16 ):
         super().__init__()
+        self.device = torch.device( device )
+        # Half precision halves the weight memory and bandwidth on GPU, CPU kernels
+        # for half are missing or slow so we stay in full precision there.
+        self.dtype = torch.float16 if self.device.type == 'cuda' else torch.float32
         config = AutoConfig.from_pretrained( model_path )
-        self.model = AutoModelForCausalLM.from_config( config )
+        # Every weight is overwritten by the reward checkpoint, skip the random init of the 6B parameters.
+        with no_init_weights():
+            self.model = AutoModelForCausalLM.from_config( config, torch_dtype = self.dtype )
         self.config = self.model.config
         # `gpt-neo(x)` models use `hidden_size` attribute names instead of `n_embd``
         if config is None: config = RewardModel.config()
 
         self.config.n_embd = self.config.hidden_size if hasattr(self.config, "hidden_size") else self.config.n_embd
-        self.device = torch.device( device )
+        self.batch_size = batch_size
+        # Rounds padded lengths up to a multiple of this value when set, bounding the
+        # number of distinct input shapes seen by a compiled transformer.
+        self.pad_to_multiple_of = None
         self.transformer = self.model.transformer
-        self.v_head = nn.Linear(self.config.n_embd, 1, bias=False)
-        self.tokenizer = AutoTokenizer.from_pretrained('EleutherAI/gpt-j-6b')
+        self.v_head = nn.Linear(self.config.n_embd, 1, bias=False, dtype=self.dtype)
+        self.tokenizer = AutoTokenizer.from_pretrained('EleutherAI/gpt-j-6b', use_fast=True)
         self.tokenizer.pad_token = self.tokenizer.eos_token
         self.PAD_ID = self.tokenizer(self.tokenizer.pad_token)["input_ids"][0]
+        self.EOS_ID = self.tokenizer.eos_token_id
 
     def reward( self, full_completions: List[str],  comp: List[str], difference=False, shift =3) -> torch.FloatTensor:
         def reward_fn( samples ):
-            if samples is None: return 0
-            scores_list = []
-            batch_size = 1
-            for i in range(0, len(samples), batch_size):
-                sub_samples = samples[i : i + batch_size]
-                sub_samples = [
-                    "<|startoftext|>" + chosen + "<|endoftext|>" for chosen in sub_samples
-                ]
-                encodings_dict = self.tokenizer(
-                    sub_samples,
-                    truncation=False,
-                    max_length=550,
-                    padding="max_length",
+            if samples is None or len( samples ) == 0: return torch.zeros( 0 )
+            # "<|endoftext|>" is a special token and always encodes to EOS_ID on its own, so append the id
+            # rather than re-encoding the marker for every sample. "<|startoftext|>" is not in the vocab
+            # and can merge with the start of the sample, so it stays part of the text.
+            samples = [ "<|startoftext|>" + chosen for chosen in samples ]
+            all_input_ids = [ input_ids + [ self.EOS_ID ] for input_ids in self.tokenizer( samples, truncation=False )["input_ids"] ]
+
+            # Batch samples of similar length together so each batch only pads
+            # up to its own longest sample instead of the longest overall.
+            order = sorted( range( len( samples ) ), key = lambda idx: len( all_input_ids[ idx ] ) )
+            # Scores are written straight into their original positions, no concatenation or reordering after the loop.
+            order_index = torch.tensor( order, dtype = torch.int64, device = self.device )
+            scores = torch.empty( len( samples ), dtype = torch.float32, device = self.device )
+            for i in range(0, len(samples), self.batch_size):
+                sub_input_ids = [ all_input_ids[ idx ] for idx in order[i : i + self.batch_size] ]
+                encodings_dict = self.tokenizer.pad(
+                    { "input_ids": sub_input_ids },
+                    padding="longest",
+                    pad_to_multiple_of=self.pad_to_multiple_of,
                     return_tensors="pt",
                 )
-                input_ids = encodings_dict["input_ids"].to( self.device )
-                attn_masks = encodings_dict["attention_mask"].to( self.device )
-                input_ids = input_ids.repeat(2, 1)
-                attn_masks = attn_masks.repeat(2, 1)
-                with torch.no_grad():
-                    sub_scores = self.forward(input_ids=input_ids.to( self.device ), attention_mask=attn_masks.to( self.device ))
-                scores_list.append(sub_scores["chosen_end_scores"])
-            scores = torch.cat(scores_list, dim=0).mean().item()
-            return scores
+                input_ids = encodings_dict["input_ids"]
+                attn_masks = encodings_dict["attention_mask"]
+                if self.device.type == 'cuda':
+                    # Copies from pinned memory are asynchronous, so the host can go on to pad the next batch.
+                    input_ids = input_ids.pin_memory().to( self.device, non_blocking = True )
+                    attn_masks = attn_masks.pin_memory().to( self.device, non_blocking = True )
+                # Only the forward runs in inference mode, scores is allocated outside of it so it stays a normal
+                # tensor which callers can still use in autograd, e.g. as the gating model targets.
+                with torch.inference_mode():
+                    sub_scores = self.end_scores( input_ids = input_ids, attention_mask = attn_masks )
+                scores[ order_index[i : i + self.batch_size] ] = sub_scores.float()
+            return scores.cpu()
         
         with torch.no_grad():
-            full_rewards = [reward_fn([completion]) for completion in full_completions]
             if difference:
-                comp_rewards = [reward_fn([completion]) for completion in comp]
-                return torch.nn.functional.relu(torch.tensor(full_rewards, dtype=torch.float32)+shift) - torch.nn.functional.relu(torch.tensor(comp_rewards, dtype=torch.float32)+shift)
+                # Both sets are independent, score them in a single pass so they share the length sorted batches.
+                all_rewards = reward_fn( list( full_completions ) + list( comp ) )
+                full_rewards, comp_rewards = all_rewards[ :len( full_completions ) ], all_rewards[ len( full_completions ): ]
+                return torch.nn.functional.relu(full_rewards+shift) - torch.nn.functional.relu(comp_rewards+shift)
             else:
-                for completion, f_reward in zip(full_completions, full_rewards):
+                full_rewards = reward_fn( full_completions )
+                for completion, f_reward in zip(full_completions, full_rewards.tolist()):
                     print(completion)
                     print(f_reward)
-                return torch.tensor(full_rewards, dtype=torch.float32)
+                return full_rewards
+
+    def end_scores( self, input_ids: torch.LongTensor, attention_mask: torch.LongTensor ) -> torch.FloatTensor:
+        r""" Returns the reward at the last token before the first padding token of each sequence.
+            This is the inference path of forward() without the chosen/rejected pairing, so the
+            batch does not need to be duplicated.
+        """
+        hidden_states = self.transformer( input_ids, attention_mask = attention_mask )[0]
+        rewards = self.v_head( hidden_states ).squeeze( -1 )
+
+        # Index of the first padding token, or the sequence length if there is no padding.
+        is_pad = input_ids == self.PAD_ID
+        c_ind = torch.where( is_pad.any( dim = 1 ), is_pad.int().argmax( dim = 1 ), input_ids.shape[1] )
+        return rewards[ torch.arange( input_ids.shape[0], device = input_ids.device ), c_ind - 1 ]
+
     def forward(
         self,
         input_ids=None,
@@ -0,0 +1,36 @@
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+# Copyright © 2022 Opentensor Foundation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import bittensor
+
+wallet = bittensor.wallet.mock()
+
+def test_dendrite_not_serving_is_unavailable():
+    axon_info = bittensor.axon_info(
+        version = bittensor.__version_as_int__,
+        ip = '0.0.0.0',
+        port = 8091,
+        ip_type = 4,
+        hotkey = wallet.hotkey.ss58_address,
+        coldkey = wallet.coldkeypub.ss58_address,
+    )
+    dendrite = bittensor.text_prompting( keypair = wallet.hotkey, axon = axon_info )
+    forward_call = dendrite.forward( roles = ['user'], messages = ['hello'], timeout = 1 )
+    assert forward_call.return_code == bittensor.proto.ReturnCode.Unavailable
+    assert not forward_call.is_success
+    assert forward_call.completion == ''
@@ -0,0 +1,97 @@
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+# Copyright © 2022 Opentensor Foundation
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import asyncio
+import pytest
+import bittensor
+from unittest.mock import MagicMock
+
+class MockForwardCall:
+    def __init__( self, uid: int, completion: str ):
+        self.uid = uid
+        self.completion = completion
+        self.reward = None
+
+    async def async_backward( self, reward, timeout = 12 ):
+        self.reward = reward
+        return self.uid
+
+class MockDendrite:
+    def __init__( self, uid: int, completion: str, delay: float ):
+        self.uid = uid
+        self.ip = '0.0.0.0'
+        self.completion = completion
+        self.delay = delay
+        self.cancelled = False
+
+    async def async_forward( self, roles, messages, return_call = True, timeout = 12 ):
+        try:
+            await asyncio.sleep( self.delay )
+        except asyncio.CancelledError:
+            # Unwinding takes more than one loop step, as closing a real call does.
+            await asyncio.sleep( 0 )
+            await asyncio.sleep( 0 )
+            self.cancelled = True
+            raise
+        return MockForwardCall( self.uid, self.completion )
+
+def _pool( dendrites ):
+    return bittensor.text_prompting_pool( keypair = MagicMock(), metagraph = MagicMock(), dendrites = dendrites )
+
+def _accept( call ):
+    return len( call.completion ) > 0
+
+def test_forward_first_waits_for_slower_higher_priority_call():
+    dendrites = [
+        MockDendrite( uid = 0, completion = 'slow but first', delay = 0.2 ),
+        MockDendrite( uid = 1, completion = 'fast', delay = 0.0 ),
+    ]
+    call = _pool( dendrites ).forward_first( roles = ['user'], messages = ['hello'], uids = [0, 1], accept = _accept )
+    assert call.uid == 0
+
+def test_forward_first_returns_first_accepted_and_cancels_the_rest():
+    dendrites = [
+        MockDendrite( uid = 0, completion = '', delay = 0.05 ),
+        MockDendrite( uid = 1, completion = 'accepted', delay = 0.0 ),
+        MockDendrite( uid = 2, completion = 'too late', delay = 10.0 ),
+    ]
+    pool = _pool( dendrites )
+    call = pool.forward_first( roles = ['user'], messages = ['hello'], uids = [0, 1, 2], accept = _accept )
+    assert call.uid == 1
+    # The remaining query was cancelled and awaited before returning, so nothing is left on the loop.
+    assert dendrites[2].cancelled
+    assert len( [ task for task in asyncio.all_tasks( pool.loop ) if not task.done() ] ) == 0
+
+def test_forward_first_returns_none_when_nothing_is_accepted():
+    dendrites = [
+        MockDendrite( uid = 0, completion = '', delay = 0.0 ),
+        MockDendrite( uid = 1, completion = '', delay = 0.01 ),
+    ]
+    assert _pool( dendrites ).forward_first( roles = ['user'], messages = ['hello'], uids = [0, 1], accept = _accept ) is None
+
+def test_backward_sends_each_reward_to_its_call():
+    calls = [ MockForwardCall( uid = 3, completion = 'a' ), MockForwardCall( uid = 5, completion = 'b' ) ]
+    pool = _pool( [ MockDendrite( uid = 0, completion = '', delay = 0.0 ) ] )
+    assert pool.backward( forward_calls = calls, rewards = [ 0.25, 0.75 ] ) == [ 3, 5 ]
+    assert [ call.reward for call in calls ] == [ 0.25, 0.75 ]
+
+def test_backward_rejects_mismatched_rewards():
+    calls = [ MockForwardCall( uid = 3, completion = 'a' ), MockForwardCall( uid = 5, completion = 'b' ) ]
+    pool = _pool( [ MockDendrite( uid = 0, completion = '', delay = 0.0 ) ] )
+    with pytest.raises( ValueError ):
+        pool.backward( forward_calls = calls, rewards = [ 0.25 ] )